@@ -0,0 +1,177 @@
+import hashlib
+import json
+import os
+from typing import Any, Callable, Dict, Optional, Type
+
+from pydantic import BaseModel
+
+CASSETTE_MODES = ('off', 'record', 'replay')
+CASSETTE_FORMAT_VERSION = 1
+DEFAULT_CASSETTE_PATH = 'data/cassette.json'
+
+
+class CassetteMiss(Exception):
+    """Raised in replay mode when a request has no recorded response."""
+
+
+class RecordedError(Exception):
+    """Raised in replay mode for a call that failed while recording."""
+
+
+def _sha256(text: str) -> str:
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def compute_prompt_version(model: str, system_prompt: str, output_type: Type[BaseModel]) -> str:
+    """
+    Short fingerprint of everything that shapes an agent's answer besides the
+    user input. Any prompt, model or schema tweak yields a new version, so
+    stale recordings miss instead of silently replaying.
+    """
+    schema = json.dumps(output_type.model_json_schema(), sort_keys=True)
+    return _sha256(f"{model}\n{system_prompt}\n{schema}")[:12]
+
+
+class Cassette:
+    """
+    A JSON file of recorded agent requests and structured responses.
+
+    Each key holds every response recorded for that request, in call order,
+    so repeated calls (e.g. consistency runs) replay what was actually seen.
+    A response is either {'output': ...} or, for a failed call, {'error': ...}.
+    Recordings are kept in memory and written by `save()`, or on exit when
+    used as a context manager.
+    """
+
+    def __init__(self, path: str = DEFAULT_CASSETTE_PATH):
+        self.path = path
+        self._interactions: Optional[Dict[str, dict]] = None
+        self._recorded_keys = set()
+        self._replay_positions: Dict[str, int] = {}
+        self._dirty = False
+
+    @property
+    def interactions(self) -> Dict[str, dict]:
+        # Loaded lazily so 'off' mode never touches the file
+        if self._interactions is None:
+            if os.path.exists(self.path):
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                self._interactions = data.get('interactions', {})
+            else:
+                self._interactions = {}
+        return self._interactions
+
+    @staticmethod
+    def make_key(agent_name: str, prompt_version: str, user_input: str) -> str:
+        return f"{agent_name}:{prompt_version}:{_sha256(user_input)}"
+
+    def next_response(self, key: str) -> Optional[dict]:
+        """Next recorded response for `key`, or None once they run out."""
+        interaction = self.interactions.get(key)
+        position = self._replay_positions.get(key, 0)
+        if interaction is None or position >= len(interaction['responses']):
+            return None
+        self._replay_positions[key] = position + 1
+        return interaction['responses'][position]
+
+    def record(self, key: str, interaction: dict, response: dict):
+        """Append a response; the first one this session replaces older recordings."""
+        if key not in self._recorded_keys:
+            self.interactions[key] = dict(interaction, responses=[])
+            self._recorded_keys.add(key)
+        self.interactions[key]['responses'].append(response)
+        self._dirty = True
+
+    def save(self):
+        if not self._dirty:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'version': CASSETTE_FORMAT_VERSION,
+                'interactions': self.interactions
+            }, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
+        self._dirty = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.save()
+
+
+class CassetteResult:
+    """Stand-in for an agent run result when the output comes from a cassette."""
+
+    def __init__(self, output: BaseModel):
+        self.output = output
+
+
+class CassetteAgent:
+    """
+    Record/replay wrapper exposing the same `run()` as a pydantic-ai Agent.
+
+    - off: call the wrapped agent as usual.
+    - record: call the wrapped agent and store the request and structured
+      response in the cassette. Failed calls are stored too, then re-raised.
+    - replay: serve the stored responses in recorded order with no network
+      call. Recorded failures raise RecordedError. CassetteMiss is raised if
+      the request was never recorded or its responses have run out.
+
+    The wrapped agent is built by `agent_factory` on first live use, so
+    replay mode never needs provider credentials.
+    """
+
+    def __init__(self, agent_factory: Callable[[], Any], name: str, model: str, system_prompt: str,
+                 output_type: Type[BaseModel], cassette: Cassette, mode: str = 'off'):
+        if mode not in CASSETTE_MODES:
+            raise ValueError(f"Unknown cassette mode '{mode}'. Choose from: {', '.join(CASSETTE_MODES)}")
+        self.agent_factory = agent_factory
+        self._agent = None
+        self.name = name
+        self.output_type = output_type
+        self.cassette = cassette
+        self.mode = mode
+        self.prompt_version = compute_prompt_version(model, system_prompt, output_type)
+
+    @property
+    def agent(self):
+        if self._agent is None:
+            self._agent = self.agent_factory()
+        return self._agent
+
+    async def run(self, user_input: str):
+        if self.mode == 'off':
+            return await self.agent.run(user_input)
+
+        key = Cassette.make_key(self.name, self.prompt_version, user_input)
+
+        if self.mode == 'replay':
+            response = self.cassette.next_response(key)
+            if response is None:
+                raise CassetteMiss(
+                    f"No recording left for {self.name} (prompt version {self.prompt_version}) "
+                    f"in {self.cassette.path}. Re-run with AGENT_CASSETTE_MODE=record."
+                )
+            if 'error' in response:
+                raise RecordedError(response['error'])
+            return CassetteResult(self.output_type.model_validate(response['output']))
+
+        interaction = {
+            'agent': self.name,
+            'prompt_version': self.prompt_version,
+            'input': user_input
+        }
+        try:
+            result = await self.agent.run(user_input)
+        except Exception as e:
+            # Keep the failure so replay reproduces the recording run call for call
+            self.cassette.record(key, interaction, {'error': f"{type(e).__name__}: {e}"})
+            raise
+        self.cassette.record(key, interaction, {'output': result.output.model_dump()})
+        return result
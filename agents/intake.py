@@ -0,0 +1,270 @@
+import asyncio
+import heapq
+import itertools
+import math
+import time
+from dataclasses import dataclass, field
+from typing import AsyncIterable, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+from .schemas import FinalRoute
+from .system import URGENCY_KEYWORDS, analyze_ticket_keywords, run_analysis_pipeline
+
+# Pre-score weights. These are computed without the LLM so that tickets can be
+# ordered before any provider quota is spent on them.
+TIER_WEIGHTS = {
+    'enterprise': 40.0,
+    'premium': 20.0,
+    'free': 0.0
+}
+REVENUE_WEIGHT = 4.0          # Points per order of magnitude of monthly revenue
+REVENUE_CAP = 20.0
+SECURITY_WEIGHT = 50.0        # Points for any security keyword hit
+URGENCY_WEIGHTS = {5: 10.0, 4: 5.0}   # Points per unique keyword at its highest level
+URGENCY_CAP = 20.0
+
+# Pre-score thresholds for each intake class (security hits are always Critical)
+CLASS_THRESHOLDS = [
+    ('Critical', 75.0),
+    ('High', 45.0),
+    ('Medium', 20.0),
+    ('Low', float('-inf'))
+]
+INTAKE_CLASSES = [name for name, _ in CLASS_THRESHOLDS]
+
+# Points a waiting non-critical ticket gains per second so it is never starved.
+# Waits in a quota-bound backlog run to minutes, so this is kept small enough
+# that pre-score still decides order: 0.05/s is 3 points per minute, and a
+# free-tier ticket needs over 20 minutes of extra waiting to overtake a
+# typical enterprise one.
+DEFAULT_AGING_RATE = 0.05
+
+
+def _urgency_points(subject: str, message: str) -> float:
+    """Score each urgency keyword hit once, at the highest level it is listed under."""
+    full_text = f"{subject} {message}".lower()
+    keyword_levels = {}
+    for level, keywords in URGENCY_KEYWORDS.items():
+        for kw in keywords:
+            keyword_levels[kw] = max(level, keyword_levels.get(kw, level))
+    return sum(
+        URGENCY_WEIGHTS.get(level, 0.0)
+        for kw, level in keyword_levels.items()
+        if kw in full_text
+    )
+
+
+def compute_pre_score(ticket_data: dict) -> Tuple[float, str]:
+    """Cheap, LLM-free priority score and intake class for a ticket."""
+    keywords = analyze_ticket_keywords(ticket_data['subject'], ticket_data['message'])
+    security_hits = keywords['keyword_analysis']['security_matches']
+
+    score = TIER_WEIGHTS.get(ticket_data.get('customer_tier', 'free'), 0.0)
+
+    revenue = max(float(ticket_data.get('monthly_revenue', 0) or 0), 0.0)
+    score += min(REVENUE_WEIGHT * math.log10(1 + revenue), REVENUE_CAP)
+
+    if security_hits:
+        score += SECURITY_WEIGHT
+
+    urgency_points = _urgency_points(ticket_data['subject'], ticket_data['message'])
+    score += min(urgency_points, URGENCY_CAP)
+
+    # Security always jumps the line, regardless of customer value
+    if security_hits:
+        return score, 'Critical'
+
+    for intake_class, threshold in CLASS_THRESHOLDS:
+        if score >= threshold:
+            return score, intake_class
+    return score, 'Low'
+
+
+@dataclass
+class IntakeItem:
+    """A ticket waiting in the intake queue."""
+    ticket_data: dict
+    pre_score: float
+    intake_class: str
+    enqueued_at: float
+    dequeued_at: Optional[float] = None
+    sequence: int = field(default=0, repr=False)
+
+    @property
+    def wait_seconds(self) -> Optional[float]:
+        if self.dequeued_at is None:
+            return None
+        return self.dequeued_at - self.enqueued_at
+
+
+class PriorityIntakeQueue:
+    """
+    Async priority queue placed in front of run_analysis_pipeline.
+
+    Critical tickets live in their own lane and are always served first, so
+    they never wait behind bulk traffic. All other tickets share a lane ordered
+    by pre-score plus linear aging (aging_rate points per second waited).
+    Because aging is linear and shared, the ordering key
+    pre_score - aging_rate * enqueued_at is fixed at insert time and a plain
+    heap gives the aged order without re-scoring. Aging only matters when
+    tickets arrive over time; a batch enqueued in one burst is ordered by
+    pre-score alone.
+    """
+
+    def __init__(self, aging_rate: float = DEFAULT_AGING_RATE,
+                 clock: Callable[[], float] = time.monotonic):
+        self.aging_rate = aging_rate
+        self._clock = clock
+        self._critical: List[tuple] = []
+        self._standard: List[tuple] = []
+        self._counter = itertools.count()
+        self._condition = asyncio.Condition()
+        self._closed = False
+        self._waits: Dict[str, List[float]] = {name: [] for name in INTAKE_CLASSES}
+
+    def qsize(self) -> int:
+        return len(self._critical) + len(self._standard)
+
+    def _push(self, ticket_data: dict) -> IntakeItem:
+        if self._closed:
+            raise RuntimeError("Cannot add tickets to a closed intake queue")
+        pre_score, intake_class = compute_pre_score(ticket_data)
+        item = IntakeItem(
+            ticket_data=ticket_data,
+            pre_score=pre_score,
+            intake_class=intake_class,
+            enqueued_at=self._clock(),
+            sequence=next(self._counter)
+        )
+        key = -(item.pre_score - self.aging_rate * item.enqueued_at)
+        lane = self._critical if intake_class == 'Critical' else self._standard
+        heapq.heappush(lane, (key, item.sequence, item))
+        return item
+
+    async def put(self, ticket_data: dict) -> IntakeItem:
+        """Score a ticket and add it to the queue."""
+        async with self._condition:
+            item = self._push(ticket_data)
+            self._condition.notify_all()
+        return item
+
+    async def close(self):
+        """Stop accepting tickets; waiting consumers drain and then get None."""
+        async with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+    def _ready(self, critical_only: bool) -> bool:
+        if self._critical:
+            return True
+        # Once closed no Critical ticket can arrive, so reserved consumers help drain
+        return bool(self._standard) and (not critical_only or self._closed)
+
+    async def get(self, critical_only: bool = False) -> Optional[IntakeItem]:
+        """
+        Wait for the highest-priority ticket. A `critical_only` consumer waits
+        for Critical tickets while producers are active. Returns None once the
+        queue is closed and empty.
+        """
+        async with self._condition:
+            await self._condition.wait_for(
+                lambda: self._ready(critical_only) or self._closed
+            )
+            if not self._ready(critical_only):
+                return None
+            lane = self._critical if self._critical else self._standard
+            _, _, item = heapq.heappop(lane)
+            item.dequeued_at = self._clock()
+            self._waits[item.intake_class].append(item.wait_seconds)
+            return item
+
+    def wait_stats(self) -> Dict[str, dict]:
+        """Queue-wait metrics in seconds, reported by intake class."""
+        stats = {}
+        for intake_class, waits in self._waits.items():
+            if not waits:
+                stats[intake_class] = {'count': 0, 'mean': 0.0, 'p95': 0.0, 'max': 0.0}
+                continue
+            ordered = sorted(waits)
+            p95_index = min(len(ordered) - 1, math.ceil(0.95 * len(ordered)) - 1)
+            stats[intake_class] = {
+                'count': len(ordered),
+                'mean': sum(ordered) / len(ordered),
+                'p95': ordered[p95_index],
+                'max': ordered[-1]
+            }
+        return stats
+
+
+async def run_prioritized_pipeline(
+    tickets: Union[Iterable[dict], AsyncIterable[dict]],
+    concurrency: int = 2,
+    reserved_critical_workers: int = 1,
+    aging_rate: float = DEFAULT_AGING_RATE,
+    pipeline: Callable[[dict], Awaitable[FinalRoute]] = run_analysis_pipeline,
+    clock: Callable[[], float] = time.monotonic,
+    verbose: bool = True
+) -> Tuple[Dict[str, FinalRoute], Dict[str, dict]]:
+    """
+    Run tickets through the pipeline in priority order.
+
+    `concurrency` bounds the number of in-flight LLM pipelines (i.e. provider
+    quota). `tickets` may be a plain iterable (a batch, enqueued up front) or
+    an async iterable of tickets arriving over time. For a streamed source,
+    tickets age while they wait and `reserved_critical_workers` of the
+    workers only take Critical tickets until the source is exhausted, so a
+    late critical ticket is picked up even while bulk traffic fills the rest.
+    A batch needs no reservation since every worker serves Critical first.
+    Returns the routing results keyed by ticket_id and the queue-wait stats.
+    Pass verbose=False to skip the per-ticket intake line.
+    """
+    if concurrency < 1:
+        raise ValueError("concurrency must be at least 1")
+
+    queue = PriorityIntakeQueue(aging_rate=aging_rate, clock=clock)
+    streaming = hasattr(tickets, '__aiter__')
+
+    if streaming:
+        reserved_critical_workers = max(0, min(reserved_critical_workers, concurrency - 1))
+    else:
+        for ticket in tickets:
+            await queue.put(ticket)
+        await queue.close()
+        reserved_critical_workers = 0
+
+    results: Dict[str, FinalRoute] = {}
+
+    async def producer():
+        try:
+            async for ticket in tickets:
+                await queue.put(ticket)
+        finally:
+            await queue.close()
+
+    async def worker(critical_only: bool):
+        while True:
+            item = await queue.get(critical_only=critical_only)
+            if item is None:
+                return
+            ticket_id = item.ticket_data['ticket_id']
+            if verbose:
+                print(f"[intake] {ticket_id} class={item.intake_class} "
+                      f"pre_score={item.pre_score:.1f} waited={item.wait_seconds:.2f}s")
+            results[ticket_id] = await pipeline(item.ticket_data)
+
+    tasks = [asyncio.create_task(worker(critical_only=i < reserved_critical_workers))
+             for i in range(concurrency)]
+    if streaming:
+        tasks.append(asyncio.create_task(producer()))
+
+    # Fail fast: one failing pipeline cancels the remaining workers
+    try:
+        done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+        for task in done:
+            if task.exception() is not None:
+                raise task.exception()
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    return results, queue.wait_stats()
@@ -0,0 +1,288 @@
+import asyncio
+import csv
+import json
+import os
+import time
+from typing import Callable, Dict, List, Optional
+
+# Columnar output is optional and only used if pyarrow is installed locally
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+# Flat column layout shared by every writer
+ROW_COLUMNS = [
+    'ticket_id',
+    'category',
+    'urgency_score',
+    'sentiment',
+    'business_impact',
+    'customer_risk',
+    'recommended_queue',
+    'priority',
+    'reasoning',
+    'triage_ms',
+    'prioritization_ms',
+    'total_ms'
+]
+
+DEFAULT_MAX_ROWS = 1000
+DEFAULT_MAX_INTERVAL = 5.0   # Seconds between time-based flushes
+DEFAULT_ROW_GROUP_SIZE = 100_000
+
+
+def build_row(record: dict) -> dict:
+    """Flatten a run_detailed_analysis_pipeline record into one output row."""
+    triage = record.get('triage')
+    prioritization = record.get('prioritization')
+    final_route = record['final_route']
+    timing = record.get('timing', {})
+    return {
+        'ticket_id': record['ticket_id'],
+        'category': triage.category if triage else None,
+        'urgency_score': triage.urgency_score if triage else None,
+        'sentiment': triage.sentiment if triage else None,
+        'business_impact': prioritization.business_impact if prioritization else None,
+        'customer_risk': prioritization.customer_risk if prioritization else None,
+        'recommended_queue': final_route.recommended_queue,
+        'priority': final_route.priority,
+        'reasoning': final_route.reasoning,
+        'triage_ms': timing.get('triage_ms'),
+        'prioritization_ms': timing.get('prioritization_ms'),
+        'total_ms': timing.get('total_ms')
+    }
+
+
+class BufferedSink:
+    """
+    Base class for batched row writers.
+
+    Rows are buffered in memory and handed to `_write_batch` once `max_rows`
+    rows are pending or `max_interval` seconds have passed since the last
+    flush. The time limit is checked on each write; under asyncio, run
+    `autoflush()` as a task so it also holds while no rows arrive. Always
+    `close()` the sink, or use it as a context manager, so the tail of the
+    buffer is written.
+    """
+
+    def __init__(self, path: str, max_rows: int = DEFAULT_MAX_ROWS,
+                 max_interval: float = DEFAULT_MAX_INTERVAL,
+                 clock: Callable[[], float] = time.monotonic):
+        self.path = path
+        self.max_rows = max_rows
+        self.max_interval = max_interval
+        self.rows_written = 0
+        self._clock = clock
+        self._buffer: List[dict] = []
+        self._last_flush = clock()
+        self._closed = False
+
+    def write(self, row: dict):
+        if self._closed:
+            raise RuntimeError(f"Cannot write to closed sink: {self.path}")
+        self._buffer.append(row)
+        if (len(self._buffer) >= self.max_rows or
+                self._clock() - self._last_flush >= self.max_interval):
+            self.flush()
+
+    def write_record(self, record: dict):
+        """Write a run_detailed_analysis_pipeline record."""
+        self.write(build_row(record))
+
+    def flush(self):
+        if self._buffer:
+            self._write_batch(self._buffer)
+            self.rows_written += len(self._buffer)
+            self._buffer = []
+        self._last_flush = self._clock()
+
+    async def autoflush(self):
+        """Flush on the time limit even while the producer is stalled."""
+        while not self._closed:
+            remaining = self.max_interval - (self._clock() - self._last_flush)
+            if remaining <= 0:
+                self.flush()
+                remaining = self.max_interval
+            await asyncio.sleep(remaining)
+
+    def close(self):
+        if self._closed:
+            return
+        self.flush()
+        self._close()
+        self._closed = True
+
+    def _write_batch(self, rows: List[dict]):
+        raise NotImplementedError
+
+    def _close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class NDJSONSink(BufferedSink):
+    """One compact JSON object per line."""
+
+    def __init__(self, path: str, **kwargs):
+        super().__init__(path, **kwargs)
+        self._file = open(path, 'w', encoding='utf-8')
+
+    def _write_batch(self, rows: List[dict]):
+        self._file.write(''.join(
+            json.dumps(row, ensure_ascii=False, separators=(',', ':')) + '\n'
+            for row in rows
+        ))
+        self._file.flush()
+
+    def _close(self):
+        self._file.close()
+
+
+class CSVSink(BufferedSink):
+    """CSV with a header row and the ROW_COLUMNS layout."""
+
+    def __init__(self, path: str, **kwargs):
+        super().__init__(path, **kwargs)
+        self._file = open(path, 'w', encoding='utf-8', newline='')
+        self._writer = csv.DictWriter(self._file, fieldnames=ROW_COLUMNS)
+        self._writer.writeheader()
+
+    def _write_batch(self, rows: List[dict]):
+        self._writer.writerows(rows)
+        self._file.flush()
+
+    def _close(self):
+        self._file.close()
+
+
+def _arrow_schema():
+    return pyarrow.schema([
+        ('ticket_id', pyarrow.string()),
+        ('category', pyarrow.string()),
+        ('urgency_score', pyarrow.int8()),
+        ('sentiment', pyarrow.string()),
+        ('business_impact', pyarrow.string()),
+        ('customer_risk', pyarrow.string()),
+        ('recommended_queue', pyarrow.string()),
+        ('priority', pyarrow.string()),
+        ('reasoning', pyarrow.string()),
+        ('triage_ms', pyarrow.float64()),
+        ('prioritization_ms', pyarrow.float64()),
+        ('total_ms', pyarrow.float64())
+    ])
+
+
+class ArrowSink(BufferedSink):
+    """
+    Base for columnar writers backed by pyarrow. Each flush becomes one
+    record batch; subclasses decide how it is stored.
+    """
+
+    def __init__(self, path: str, **kwargs):
+        if pyarrow is None:
+            raise ImportError(f"{type(self).__name__} requires pyarrow, which is not installed")
+        super().__init__(path, **kwargs)
+        self._schema = _arrow_schema()
+        self._writer = self._open_writer()
+
+    def _open_writer(self):
+        raise NotImplementedError
+
+    def _to_batch(self, rows: List[dict]):
+        columns = {name: [row.get(name) for row in rows] for name in ROW_COLUMNS}
+        return pyarrow.RecordBatch.from_pydict(columns, schema=self._schema)
+
+    def _close(self):
+        self._writer.close()
+
+
+class ParquetSink(ArrowSink):
+    """
+    Parquet file. Flushed rows are held until a full row group of
+    `row_group_size` rows is ready, and the remainder is written on close.
+    A Parquet file is only readable once closed, so flushing small row
+    groups on a timer would only slow down later reads.
+    """
+
+    def __init__(self, path: str, row_group_size: int = DEFAULT_ROW_GROUP_SIZE, **kwargs):
+        self.row_group_size = row_group_size
+        self._pending: List[dict] = []
+        super().__init__(path, **kwargs)
+
+    def _open_writer(self):
+        return pyarrow.parquet.ParquetWriter(self.path, self._schema)
+
+    def _write_batch(self, rows: List[dict]):
+        self._pending.extend(rows)
+        while len(self._pending) >= self.row_group_size:
+            self._write_row_group(self._pending[:self.row_group_size])
+            self._pending = self._pending[self.row_group_size:]
+
+    def _write_row_group(self, rows: List[dict]):
+        table = pyarrow.Table.from_batches([self._to_batch(rows)])
+        self._writer.write_table(table, row_group_size=self.row_group_size)
+
+    def _close(self):
+        if self._pending:
+            self._write_row_group(self._pending)
+            self._pending = []
+        super()._close()
+
+
+class ArrowIPCSink(ArrowSink):
+    """Arrow IPC file; each flush becomes one record batch."""
+
+    def _open_writer(self):
+        return pyarrow.ipc.new_file(self.path, self._schema)
+
+    def _write_batch(self, rows: List[dict]):
+        self._writer.write_batch(self._to_batch(rows))
+
+
+SINK_FORMATS: Dict[str, type] = {
+    'ndjson': NDJSONSink,
+    'csv': CSVSink,
+    'parquet': ParquetSink,
+    'arrow': ArrowIPCSink
+}
+
+EXTENSION_FORMATS = {
+    '.ndjson': 'ndjson',
+    '.jsonl': 'ndjson',
+    '.csv': 'csv',
+    '.parquet': 'parquet',
+    '.arrow': 'arrow',
+    '.feather': 'arrow'
+}
+
+
+def columnar_available() -> bool:
+    return pyarrow is not None
+
+
+def open_sink(path: str, fmt: Optional[str] = None, **kwargs) -> BufferedSink:
+    """
+    Open a sink for `path`. The format is taken from `fmt` or the file
+    extension. A columnar format without pyarrow installed falls back to
+    NDJSON next to the requested path.
+    """
+    if fmt is None:
+        fmt = EXTENSION_FORMATS.get(os.path.splitext(path)[1].lower(), 'ndjson')
+    if fmt not in SINK_FORMATS:
+        raise ValueError(f"Unknown sink format '{fmt}'. Choose from: {', '.join(SINK_FORMATS)}")
+
+    if issubclass(SINK_FORMATS[fmt], ArrowSink) and not columnar_available():
+        fallback_path = os.path.splitext(path)[0] + '.ndjson'
+        print(f"pyarrow not installed - writing NDJSON to {fallback_path} instead of {fmt}")
+        kwargs.pop('row_group_size', None)
+        return NDJSONSink(fallback_path, **kwargs)
+
+    return SINK_FORMATS[fmt](path, **kwargs)
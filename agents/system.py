@@ -1,12 +1,41 @@
 
+import atexit
 import os
+import time
 from dotenv import load_dotenv
 from pydantic import BaseModel, Field
 from pydantic_ai import Agent
 from .schemas import TriageAnalysis, PrioritizationAnalysis, FinalRoute
+from .cassette import Cassette, CassetteAgent, CassetteMiss, DEFAULT_CASSETTE_PATH
 
 load_dotenv()
 
+# Record/replay of agent responses for fast, offline evaluation runs.
+# AGENT_CASSETTE_MODE is one of: off (default), record, replay
+AGENT_MODEL = "groq:llama3-70b-8192"
+CASSETTE_MODE = os.getenv("AGENT_CASSETTE_MODE", "off")
+agent_cassette = Cassette(os.getenv("AGENT_CASSETTE_PATH", DEFAULT_CASSETTE_PATH))
+if CASSETTE_MODE == "record":
+    # Recordings are buffered in memory and written once at exit
+    atexit.register(agent_cassette.save)
+
+def make_agent(name: str, system_prompt: str, output_type: type[BaseModel]) -> CassetteAgent:
+    """Build an agent and its record/replay wrapper from a single set of settings."""
+    # The pydantic-ai Agent is built on first live call so replay needs no API key
+    return CassetteAgent(
+        lambda: Agent(
+            model=AGENT_MODEL,
+            output_type=output_type,
+            system_prompt=system_prompt
+        ),
+        name=name,
+        model=AGENT_MODEL,
+        system_prompt=system_prompt,
+        output_type=output_type,
+        cassette=agent_cassette,
+        mode=CASSETTE_MODE
+    )
+
 
 # Configure agents with lower temperature for more deterministic outputs
 agent_config = {
@@ -63,13 +92,7 @@ First, determine the core nature of the request. Is the user asking for KNOWLEDG
 
 
 # Create agents with consistency settings
-TriageAgent = Agent(
-    model="groq:llama3-70b-8192",
-    api_key=os.getenv("GROQ_API_KEY"),
-    output_type=TriageAnalysis,
-    system_prompt=triage_agent_prompt,
-  
-)
+TriageAgent = make_agent("triage", triage_agent_prompt, TriageAnalysis)
 
 # Enhanced PrioritizationAgent with deterministic rules
 prioritization_agent_prompt = """
@@ -99,12 +122,7 @@ You are a Business Value Analyst. You apply a fixed set of rules to determine bu
 Execute these rules based on the provided inputs and return the structured analysis.
 """ 
 
-PrioritizationAgent = Agent(
-    model="groq:llama3-70b-8192",
-    api_key=os.getenv("GROQ_API_KEY"),
-    output_type=PrioritizationAnalysis,
-    system_prompt=prioritization_agent_prompt
-)
+PrioritizationAgent = make_agent("prioritization", prioritization_agent_prompt, PrioritizationAnalysis)
 
 # Create a deterministic input formatter for consistency
 def format_triage_input(ticket_data: dict) -> str:
@@ -230,48 +248,88 @@ def route_decision_maker(triage: TriageAnalysis, priority: PrioritizationAnalysi
 
 
 # Enhanced pipeline with consistent input formatting
-async def run_analysis_pipeline(ticket_data: dict) -> FinalRoute:
-    """Enhanced analysis pipeline with improved consistency."""
-    print(f"\n----- Starting Analysis for {ticket_data['ticket_id']} -----")
+async def run_detailed_analysis_pipeline(ticket_data: dict, verbose: bool = True) -> dict:
+    """
+    Run the full pipeline and keep the intermediate agent outputs and timings.
+    `triage` and `prioritization` are None if the pipeline failed before them.
+    Pass verbose=False to skip the per-step progress output (e.g. batch exports).
+    """
+    log = print if verbose else (lambda *args, **kwargs: None)
+    log(f"\n----- Starting Analysis for {ticket_data['ticket_id']} -----")
+    
+    record = {
+        'ticket_id': ticket_data['ticket_id'],
+        'triage': None,
+        'prioritization': None,
+        'final_route': None,
+        'timing': {'triage_ms': None, 'prioritization_ms': None, 'total_ms': None}
+    }
+    started = time.perf_counter()
     
     try:
         # Step 1: Triage Agent analysis with consistent formatting
-        print("1. Running TriageAgent...")
+        log("1. Running TriageAgent...")
+        step_started = time.perf_counter()
         triage_input = format_triage_input(ticket_data)
         triage_result = await TriageAgent.run(triage_input)
         triage_analysis = triage_result.output
-        print(f"   - Category: {triage_analysis.category}")
-        print(f"   - Urgency: {triage_analysis.urgency_score}")
-        print(f"   - Sentiment: {triage_analysis.sentiment}")
+        record['triage'] = triage_analysis
+        record['timing']['triage_ms'] = (time.perf_counter() - step_started) * 1000
+        log(f"   - Category: {triage_analysis.category}")
+        log(f"   - Urgency: {triage_analysis.urgency_score}")
+        log(f"   - Sentiment: {triage_analysis.sentiment}")
         
         # Step 2: Prioritization Agent analysis with consistent formatting
-        print("2. Running PrioritizationAgent...")
+        log("2. Running PrioritizationAgent...")
+        step_started = time.perf_counter()
         priority_input = format_prioritization_input(ticket_data, triage_analysis.sentiment)
         prioritization_result = await PrioritizationAgent.run(priority_input)
         prioritization_analysis = prioritization_result.output
-        print(f"   - Business Impact: {prioritization_analysis.business_impact}")
-        print(f"   - Customer Risk: {prioritization_analysis.customer_risk}")
+        record['prioritization'] = prioritization_analysis
+        record['timing']['prioritization_ms'] = (time.perf_counter() - step_started) * 1000
+        log(f"   - Business Impact: {prioritization_analysis.business_impact}")
+        log(f"   - Customer Risk: {prioritization_analysis.customer_risk}")
         
         # Step 3: Deterministic routing decision
-        print("3. Making final routing decision...")
+        log("3. Making final routing decision...")
         final_decision = route_decision_maker(triage_analysis, prioritization_analysis)
-        print(f"   - Queue: {final_decision.recommended_queue}")
-        print(f"   - Priority: {final_decision.priority}")
+        log(f"   - Queue: {final_decision.recommended_queue}")
+        log(f"   - Priority: {final_decision.priority}")
         
-        print("----- Analysis Complete -----")
-        return final_decision
+        log("----- Analysis Complete -----")
+        record['final_route'] = final_decision
         
+    except CassetteMiss:
+        # A replay miss means the recording is stale; never mask it with a default route
+        raise
     except Exception as e:
         print(f"Error in analysis pipeline: {str(e)}")
         # Return a safe default routing
-        return FinalRoute(
+        record['final_route'] = FinalRoute(
             recommended_queue='Tier_1_Support',
             priority='Medium',
             reasoning=f"Pipeline error - defaulting to standard routing: {str(e)}"
         )
+    
+    record['timing']['total_ms'] = (time.perf_counter() - started) * 1000
+    return record
+
+async def run_analysis_pipeline(ticket_data: dict) -> FinalRoute:
+    """Enhanced analysis pipeline with improved consistency."""
+    record = await run_detailed_analysis_pipeline(ticket_data)
+    return record['final_route']
 
 # Additional utility functions for debugging and analysis
 
+# Urgency keywords by level; a keyword may appear under more than one level
+URGENCY_KEYWORDS = {
+    5: ['production down', 'system down', 'critical', 'emergency', 'urgent', 'immediately'],
+    4: ['high priority', 'important', 'asap', 'urgent', 'major issue'],
+    3: ['issue', 'problem', 'not working'],
+    2: ['minor', 'small issue', 'cosmetic'],
+    1: ['question', 'help', 'guidance']
+}
+
 def analyze_ticket_keywords(subject: str, message: str) -> dict:
     """Analyze keywords in ticket for debugging classification issues."""
     
@@ -285,14 +343,6 @@ def analyze_ticket_keywords(subject: str, message: str) -> dict:
     security_keywords = ['security', 'vulnerability', 'breach', 'unauthorized', 'suspicious', 'hack']
     billing_keywords = ['payment', 'billing', 'invoice', 'charge', 'subscription', 'refund', 'pricing']
     
-    urgency_keywords = {
-        5: ['production down', 'system down', 'critical', 'emergency', 'urgent', 'immediately'],
-        4: ['high priority', 'important', 'asap', 'urgent', 'major issue'],
-        3: ['issue', 'problem', 'not working'],
-        2: ['minor', 'small issue', 'cosmetic'],
-        1: ['question', 'help', 'guidance']
-    }
-    
     # Count matches
     keyword_analysis = {
         'bug_matches': sum(1 for kw in bug_keywords if kw in full_text),
@@ -304,7 +354,7 @@ def analyze_ticket_keywords(subject: str, message: str) -> dict:
     }
     
     # Check urgency indicators
-    for level, keywords in urgency_keywords.items():
+    for level, keywords in URGENCY_KEYWORDS.items():
         keyword_analysis['urgency_indicators'][level] = sum(1 for kw in keywords if kw in full_text)
     
     # Suggest category based on keyword analysis
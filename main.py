@@ -1,7 +1,10 @@
 import asyncio
 import json
 import argparse
-from agents.system import run_analysis_pipeline
+from typing import Optional
+from agents.system import run_analysis_pipeline, run_detailed_analysis_pipeline
+from agents.sinks import open_sink, SINK_FORMATS
+from agents.intake import run_prioritized_pipeline
 
 def load_test_cases(file_path: str) -> dict[str, dict]:
     """Loads test cases from a JSON file into a dictionary."""
@@ -9,30 +12,107 @@ def load_test_cases(file_path: str) -> dict[str, dict]:
         data = json.load(f)
     return {item['ticket_id']: item for item in data}
 
+def print_final_route(ticket_id: str, final_route):
+    """Pretty-print one routing decision."""
+    print("\n=======================================")
+    print("          FINAL ROUTING")
+    print("=======================================")
+    print(f"Ticket ID: {ticket_id}")
+    print(final_route.model_dump_json(indent=2))
+    print("=======================================\n")
+
+def print_wait_stats(wait_stats: dict[str, dict]):
+    """Print intake queue-wait metrics per class."""
+    print("\nQUEUE WAIT BY CLASS")
+    for intake_class, stats in wait_stats.items():
+        print(f"   • {intake_class}: {stats['count']} tickets | "
+              f"mean {stats['mean']:.2f}s | p95 {stats['p95']:.2f}s | max {stats['max']:.2f}s")
+
+async def analyze_tickets(tickets: list[dict], concurrency: int):
+    """Run tickets through the priority intake queue and print each routing."""
+    results, wait_stats = await run_prioritized_pipeline(tickets, concurrency=concurrency)
+    for ticket_id, final_route in results.items():
+        print_final_route(ticket_id, final_route)
+    print_wait_stats(wait_stats)
+
+async def export_tickets(tickets: list[dict], output: str, fmt: Optional[str], concurrency: int):
+    """Run tickets through the priority intake queue and write one row each to a batched sink."""
+    with open_sink(output, fmt) as sink:
+        async def export_one(ticket: dict):
+            record = await run_detailed_analysis_pipeline(ticket, verbose=False)
+            sink.write_record(record)
+            return record['final_route']
+        
+        # Keep the time-based flush going while slow LLM calls are in flight
+        flusher = asyncio.create_task(sink.autoflush())
+        try:
+            _, wait_stats = await run_prioritized_pipeline(
+                tickets, concurrency=concurrency, pipeline=export_one, verbose=False
+            )
+        finally:
+            flusher.cancel()
+    print(f"\nWrote {sink.rows_written} routing decisions to {sink.path}")
+    print_wait_stats(wait_stats)
+
 async def main():
     parser = argparse.ArgumentParser(description="Customer Support Ticket Analyzer")
     parser.add_argument(
         "ticket_id",
         type=str,
+        nargs="?",
         help="The ID of the ticket to analyze (e.g., SUP-001)."
     )
+    parser.add_argument(
+        "--all",
+        action="store_true",
+        help="Analyze every ticket in data/test_cases.json."
+    )
+    parser.add_argument(
+        "--output",
+        type=str,
+        help="Write routing rows to this file (.ndjson, .csv, .parquet, .arrow) instead of printing JSON."
+    )
+    parser.add_argument(
+        "--format",
+        choices=list(SINK_FORMATS),
+        help="Output format; defaults to the --output file extension."
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=2,
+        help="Tickets analyzed in parallel with --all (default: 2)."
+    )
     args = parser.parse_args()
     
+    if not args.ticket_id and not args.all:
+        parser.error("provide a TICKET_ID or --all")
+    if args.format and not args.output:
+        parser.error("--format requires --output")
+    if args.concurrency < 1:
+        parser.error("--concurrency must be at least 1")
+    
     articles = load_test_cases('data/test_cases.json')
-    ticket_to_process = articles.get(args.ticket_id)
     
-    if not ticket_to_process:
-        print(f"Error: Ticket with ID '{args.ticket_id}' not found.")
+    if args.all:
+        tickets = list(articles.values())
+    else:
+        ticket_to_process = articles.get(args.ticket_id)
+        if not ticket_to_process:
+            print(f"Error: Ticket with ID '{args.ticket_id}' not found.")
+            return
+        tickets = [ticket_to_process]
+    
+    if args.output:
+        await export_tickets(tickets, args.output, args.format, args.concurrency)
         return
-        
-    final_route = await run_analysis_pipeline(ticket_to_process)
     
-    print("\n=======================================")
-    print("          FINAL ROUTING")
-    print("=======================================")
-    print(f"Ticket ID: {ticket_to_process['ticket_id']}")
-    print(final_route.model_dump_json(indent=2))
-    print("=======================================\n")
+    if args.all:
+        await analyze_tickets(tickets, args.concurrency)
+        return
+    
+    final_route = await run_analysis_pipeline(tickets[0])
+    print_final_route(tickets[0]['ticket_id'], final_route)
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
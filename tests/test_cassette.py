@@ -0,0 +1,171 @@
+import asyncio
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from agents import system
+from agents.cassette import Cassette, CassetteAgent, CassetteMiss, RecordedError, compute_prompt_version
+from agents.schemas import TriageAnalysis
+
+PROMPT = "Classify the ticket."
+
+
+class FlakyAgent:
+    """Returns a different category on each call, like a non-deterministic LLM."""
+
+    def __init__(self, categories):
+        self.categories = list(categories)
+        self.calls = 0
+
+    async def run(self, user_input):
+        category = self.categories[self.calls % len(self.categories)]
+        self.calls += 1
+        return type('Result', (), {'output': TriageAnalysis(
+            category=category, urgency_score=3, sentiment='Neutral'
+        )})()
+
+
+def make_cassette_agent(agent, cassette, mode, prompt=PROMPT):
+    return CassetteAgent(lambda: agent, name='triage', model='test-model', system_prompt=prompt,
+                         output_type=TriageAnalysis, cassette=cassette, mode=mode)
+
+
+def run_all(agent, inputs):
+    async def scenario():
+        return [(await agent.run(text)).output.category for text in inputs]
+    return asyncio.run(scenario())
+
+
+def test_record_then_replay_in_order_then_miss(tmp_path):
+    path = str(tmp_path / 'cassette.json')
+    flaky = FlakyAgent(['Bug', 'General Question', 'Bug'])
+
+    with Cassette(path) as cassette:
+        recorder = make_cassette_agent(flaky, cassette, 'record')
+        recorded = run_all(recorder, ['ticket A', 'ticket A', 'ticket B'])
+        # Nothing is written until the cassette is saved
+        assert not (tmp_path / 'cassette.json').exists()
+    assert recorded == ['Bug', 'General Question', 'Bug']
+
+    offline = FlakyAgent(['Feature Request'])
+    replayer = make_cassette_agent(offline, Cassette(path), 'replay')
+    assert run_all(replayer, ['ticket A', 'ticket A', 'ticket B']) == recorded
+    assert offline.calls == 0
+
+    with pytest.raises(CassetteMiss):
+        run_all(replayer, ['ticket A'])
+    with pytest.raises(CassetteMiss):
+        run_all(replayer, ['never recorded'])
+
+
+class RateLimitedAgent(FlakyAgent):
+    """Fails on the given call numbers, like a provider hitting its rate limit."""
+
+    def __init__(self, categories, failing_calls):
+        super().__init__(categories)
+        self.failing_calls = set(failing_calls)
+
+    async def run(self, user_input):
+        if self.calls in self.failing_calls:
+            self.calls += 1
+            raise RuntimeError('429 rate limit exceeded')
+        return await super().run(user_input)
+
+
+def run_each(agent, inputs):
+    """Run each input, keeping failures in place of outputs."""
+    async def scenario():
+        outcomes = []
+        for text in inputs:
+            try:
+                outcomes.append((await agent.run(text)).output.category)
+            except Exception as e:
+                outcomes.append(type(e).__name__)
+        return outcomes
+    return asyncio.run(scenario())
+
+
+def test_failures_while_recording_replay_in_place(tmp_path):
+    path = str(tmp_path / 'cassette.json')
+    inputs = ['ticket A', 'ticket A', 'ticket A']
+    flaky = RateLimitedAgent(['Bug', 'General Question', 'Bug'], failing_calls=[1])
+
+    with Cassette(path) as cassette:
+        recorded = run_each(make_cassette_agent(flaky, cassette, 'record'), inputs)
+    assert recorded == ['Bug', 'RuntimeError', 'Bug']
+
+    replayer = make_cassette_agent(FlakyAgent(['Feature Request']), Cassette(path), 'replay')
+    # The failed call fails again on replay and later responses keep their positions
+    assert run_each(replayer, inputs) == ['Bug', 'RecordedError', 'Bug']
+    with pytest.raises(RecordedError, match='429 rate limit'):
+        replayer2 = make_cassette_agent(FlakyAgent(['Bug']), Cassette(path), 'replay')
+        run_all(replayer2, inputs[:2])
+
+
+def test_replay_and_import_need_no_api_key(tmp_path):
+    code = (
+        "import dotenv; dotenv.load_dotenv = lambda *args, **kwargs: None\n"
+        "import agents.system, agents.intake\n"
+        "assert agents.system.TriageAgent._agent is None\n"
+    )
+    env = {k: v for k, v in os.environ.items() if k != 'GROQ_API_KEY'}
+    env['AGENT_CASSETTE_MODE'] = 'replay'
+    env['AGENT_CASSETTE_PATH'] = str(tmp_path / 'cassette.json')
+    repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run([sys.executable, '-c', code], cwd=repo_root, env=env,
+                            capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+
+
+def test_prompt_change_misses_on_replay(tmp_path):
+    path = str(tmp_path / 'cassette.json')
+    with Cassette(path) as cassette:
+        run_all(make_cassette_agent(FlakyAgent(['Bug']), cassette, 'record'), ['ticket A'])
+
+    edited = make_cassette_agent(FlakyAgent(['Bug']), Cassette(path), 'replay',
+                                 prompt=PROMPT + " Be strict.")
+    with pytest.raises(CassetteMiss):
+        run_all(edited, ['ticket A'])
+
+
+def test_rerecording_replaces_previous_responses(tmp_path):
+    path = str(tmp_path / 'cassette.json')
+    with Cassette(path) as cassette:
+        run_all(make_cassette_agent(FlakyAgent(['Bug']), cassette, 'record'), ['ticket A'] * 2)
+    with Cassette(path) as cassette:
+        run_all(make_cassette_agent(FlakyAgent(['Billing Inquiry']), cassette, 'record'), ['ticket A'])
+
+    with open(path, 'r', encoding='utf-8') as f:
+        interactions = json.load(f)['interactions']
+    assert len(interactions) == 1
+    (interaction,) = interactions.values()
+    assert [response['output']['category'] for response in interaction['responses']] == ['Billing Inquiry']
+
+
+def test_off_mode_passes_through_without_touching_file(tmp_path):
+    flaky = FlakyAgent(['Bug', 'General Question'])
+    cassette = Cassette(str(tmp_path / 'cassette.json'))
+    agent = make_cassette_agent(flaky, cassette, 'off')
+    assert run_all(agent, ['ticket A', 'ticket A']) == ['Bug', 'General Question']
+    cassette.save()
+    assert not (tmp_path / 'cassette.json').exists()
+
+
+def test_make_agent_fingerprints_the_prompt_it_was_built_with():
+    assert system.TriageAgent.prompt_version == compute_prompt_version(
+        system.AGENT_MODEL, system.triage_agent_prompt, TriageAnalysis
+    )
+
+
+def test_pipeline_does_not_mask_replay_miss(tmp_path, monkeypatch):
+    replayer = make_cassette_agent(FlakyAgent(['Bug']), Cassette(str(tmp_path / 'empty.json')), 'replay')
+    monkeypatch.setattr(system, 'TriageAgent', replayer)
+    ticket = {
+        'ticket_id': 'SUP-001', 'customer_tier': 'free', 'subject': 'Broken', 'message': 'Nothing works.',
+        'previous_tickets': 0, 'monthly_revenue': 0, 'account_age_days': 2
+    }
+    with pytest.raises(CassetteMiss):
+        asyncio.run(system.run_analysis_pipeline(ticket))
@@ -0,0 +1,45 @@
+import asyncio
+import functools
+import sys
+
+import main
+from agents.intake import run_prioritized_pipeline
+from agents.schemas import FinalRoute
+
+
+async def stub_pipeline(ticket):
+    return FinalRoute(recommended_queue='Tier_1_Support', priority='Low', reasoning='stub')
+
+
+def test_all_runs_through_intake_queue_and_reports_waits(monkeypatch, capsys):
+    monkeypatch.setattr(main, 'run_prioritized_pipeline',
+                        functools.partial(run_prioritized_pipeline, pipeline=stub_pipeline))
+    monkeypatch.setattr(sys, 'argv', ['main.py', '--all', '--concurrency', '3'])
+    asyncio.run(main.main())
+    out = capsys.readouterr().out
+    # SUP-005 is a security report, so it is taken from the Critical lane first
+    assert out.index('[intake] SUP-005') < out.index('[intake] SUP-001')
+    assert out.count('FINAL ROUTING') == 5
+    assert 'QUEUE WAIT BY CLASS' in out
+    assert '• Critical: 1 tickets' in out
+
+
+def test_export_is_quiet_and_writes_every_ticket(monkeypatch, capsys, tmp_path):
+    async def stub_detailed(ticket, verbose=True):
+        assert verbose is False
+        return {
+            'ticket_id': ticket['ticket_id'],
+            'triage': None,
+            'prioritization': None,
+            'final_route': await stub_pipeline(ticket),
+            'timing': {}
+        }
+
+    output = tmp_path / 'routes.ndjson'
+    monkeypatch.setattr(main, 'run_detailed_analysis_pipeline', stub_detailed)
+    monkeypatch.setattr(sys, 'argv', ['main.py', '--all', '--output', str(output)])
+    asyncio.run(main.main())
+    out = capsys.readouterr().out
+    assert '[intake]' not in out and 'FINAL ROUTING' not in out
+    assert 'Wrote 5 routing decisions' in out
+    assert len(output.read_text(encoding='utf-8').splitlines()) == 5
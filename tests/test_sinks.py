@@ -0,0 +1,152 @@
+import asyncio
+import csv
+import json
+
+import pytest
+
+from agents.schemas import FinalRoute, PrioritizationAnalysis, TriageAnalysis
+from agents.sinks import (
+    ROW_COLUMNS, ArrowIPCSink, CSVSink, NDJSONSink, ParquetSink, build_row, open_sink
+)
+
+
+def make_record(ticket_id):
+    return {
+        'ticket_id': ticket_id,
+        'triage': TriageAnalysis(category='Bug', urgency_score=4, sentiment='Negative'),
+        'prioritization': PrioritizationAnalysis(business_impact='High', customer_risk='High'),
+        'final_route': FinalRoute(
+            recommended_queue='Tier_3_Engineering',
+            priority='Critical',
+            reasoning='High-value customer with urgent bug'
+        ),
+        'timing': {'triage_ms': 1.5, 'prioritization_ms': 2.5, 'total_ms': 4.0}
+    }
+
+
+def expected_rows(count):
+    return [build_row(make_record(f'SUP-{i:03d}')) for i in range(count)]
+
+
+def test_build_row_without_agent_outputs():
+    record = make_record('SUP-ERR')
+    record['triage'] = None
+    record['prioritization'] = None
+    row = build_row(record)
+    assert list(row) == ROW_COLUMNS
+    assert row['category'] is None and row['business_impact'] is None
+    assert row['recommended_queue'] == 'Tier_3_Engineering'
+
+
+def test_flushes_on_row_count_and_interval(tmp_path):
+    now = [0.0]
+    sink = NDJSONSink(str(tmp_path / 'out.ndjson'), max_rows=3, max_interval=10.0, clock=lambda: now[0])
+    for row in expected_rows(2):
+        sink.write(row)
+    assert sink.rows_written == 0
+    sink.write(expected_rows(1)[0])
+    assert sink.rows_written == 3
+    sink.write(expected_rows(1)[0])
+    now[0] = 10.0
+    sink.write(expected_rows(1)[0])
+    assert sink.rows_written == 5
+    sink.close()
+    with pytest.raises(RuntimeError):
+        sink.write(expected_rows(1)[0])
+
+
+def test_ndjson_round_trip(tmp_path):
+    path = tmp_path / 'out.ndjson'
+    with open_sink(str(path), max_rows=2) as sink:
+        for i in range(5):
+            sink.write_record(make_record(f'SUP-{i:03d}'))
+    with open(path, 'r', encoding='utf-8') as f:
+        rows = [json.loads(line) for line in f]
+    assert rows == expected_rows(5)
+
+
+def test_csv_round_trip(tmp_path):
+    path = tmp_path / 'out.csv'
+    with open_sink(str(path), max_rows=2) as sink:
+        assert isinstance(sink, CSVSink)
+        for i in range(5):
+            sink.write_record(make_record(f'SUP-{i:03d}'))
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        rows = list(csv.DictReader(f))
+    assert [row['ticket_id'] for row in rows] == [f'SUP-{i:03d}' for i in range(5)]
+    assert rows[0]['urgency_score'] == '4'
+    assert rows[0]['total_ms'] == '4.0'
+
+
+@pytest.mark.parametrize('filename, fmt, sink_type, magic', [
+    ('a.parquet', None, ParquetSink, b'PAR1'),
+    ('b.PARQUET', None, ParquetSink, b'PAR1'),
+    ('c.out', 'parquet', ParquetSink, b'PAR1'),
+    ('d.arrow', None, ArrowIPCSink, b'ARROW1'),
+    ('e.parquet', 'arrow', ArrowIPCSink, b'ARROW1'),
+])
+def test_columnar_format_follows_fmt(tmp_path, filename, fmt, sink_type, magic):
+    pytest.importorskip('pyarrow')
+    path = tmp_path / filename
+    with open_sink(str(path), fmt) as sink:
+        assert type(sink) is sink_type
+        sink.write_record(make_record('SUP-001'))
+    assert path.read_bytes().startswith(magic)
+
+
+def test_parquet_round_trip(tmp_path):
+    parquet = pytest.importorskip('pyarrow.parquet')
+    path = tmp_path / 'out.parquet'
+    with open_sink(str(path), max_rows=2) as sink:
+        for i in range(5):
+            sink.write_record(make_record(f'SUP-{i:03d}'))
+    table = parquet.read_table(str(path))
+    assert table.to_pylist() == expected_rows(5)
+    # Small flushes are merged into one row group, written on close
+    assert parquet.ParquetFile(str(path)).num_row_groups == 1
+
+
+def test_parquet_row_groups_follow_row_group_size(tmp_path):
+    parquet = pytest.importorskip('pyarrow.parquet')
+    path = tmp_path / 'out.parquet'
+    with open_sink(str(path), max_rows=1, row_group_size=2) as sink:
+        for i in range(5):
+            sink.write_record(make_record(f'SUP-{i:03d}'))
+    metadata = parquet.ParquetFile(str(path)).metadata
+    assert [metadata.row_group(i).num_rows for i in range(metadata.num_row_groups)] == [2, 2, 1]
+    assert parquet.read_table(str(path)).to_pylist() == expected_rows(5)
+
+
+def test_autoflush_writes_while_producer_is_stalled(tmp_path):
+    path = tmp_path / 'out.ndjson'
+
+    async def scenario():
+        with open_sink(str(path), max_interval=0.02) as sink:
+            flusher = asyncio.create_task(sink.autoflush())
+            sink.write_record(make_record('SUP-000'))
+            # No further writes: only the timer can flush the buffered row
+            await asyncio.sleep(0.1)
+            flushed = path.read_text(encoding='utf-8')
+            flusher.cancel()
+        return flushed
+
+    assert json.loads(asyncio.run(scenario())) == expected_rows(1)[0]
+
+
+def test_arrow_ipc_round_trip(tmp_path):
+    ipc = pytest.importorskip('pyarrow.ipc')
+    path = tmp_path / 'out.arrow'
+    with open_sink(str(path), max_rows=2) as sink:
+        for i in range(5):
+            sink.write_record(make_record(f'SUP-{i:03d}'))
+    reader = ipc.open_file(str(path))
+    assert reader.read_all().to_pylist() == expected_rows(5)
+    assert reader.num_record_batches == 3
+
+
+def test_columnar_falls_back_to_ndjson_without_pyarrow(tmp_path, monkeypatch):
+    monkeypatch.setattr('agents.sinks.pyarrow', None)
+    with open_sink(str(tmp_path / 'out.parquet')) as sink:
+        assert isinstance(sink, NDJSONSink)
+        sink.write_record(make_record('SUP-001'))
+    assert (tmp_path / 'out.ndjson').exists()